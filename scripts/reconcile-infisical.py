@@ -4,36 +4,72 @@ Reconcile Infisical resources from generated artifacts
 Applies roles, identities, and bindings to Infisical via API/SDK
 """
 
+import asyncio
 import json
 import yaml
 import sys
 import os
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import subprocess
 import argparse
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader
+
+# Max CLI commands in flight per phase, to stay under Infisical API rate limits
+MAX_CONCURRENCY = 16
+
+# A planned resource: its label for the summary and the CLI commands that apply it
+Planned = Tuple[str, List[List[str]]]
+
+# Artifact filename prefixes, in the order their phases are applied
+ARTIFACT_PREFIXES = ("ProjectRole_", "identity_", "binding_")
+
+# Parsed artifacts keyed by (path, mtime_ns, size), so unchanged files are parsed once
+_YAML_CACHE: Dict[tuple, Dict] = {}
+
 class InfisicalReconciler:
-    def __init__(self, project: str, dry_run: bool = False):
+    def __init__(self, project: str, dry_run: bool = False, execute: bool = False):
         self.project = project
         self.dry_run = dry_run
+        self.execute = execute
         self.artifacts_dir = Path(f".out/{project}")
         self.applied = []
         self.failed = []
+        self._log: List[str] = []
         
+    def log(self, msg: str = "") -> None:
+        """Queue a line of output; written out by flush()"""
+        self._log.append(msg)
+    
+    def flush(self) -> None:
+        """Write queued output in a single call"""
+        if self._log:
+            sys.stdout.write('\n'.join(self._log) + '\n')
+            sys.stdout.flush()
+            self._log.clear()
+    
     def load_yaml(self, filepath: Path) -> Dict:
         """Load YAML artifact file"""
-        with open(filepath, 'r') as f:
-            return yaml.safe_load(f)
+        st = filepath.stat()
+        key = (str(filepath), st.st_mtime_ns, st.st_size)
+        if key not in _YAML_CACHE:
+            with open(filepath, 'rb') as f:
+                _YAML_CACHE[key] = yaml.load(f, Loader=SafeLoader)
+        return _YAML_CACHE[key]
     
-    def apply_project_role(self, filepath: Path) -> bool:
-        """Apply ProjectRole resource"""
+    def apply_project_role(self, filepath: Path) -> Optional[Planned]:
+        """Plan ProjectRole resource, returning its label and CLI commands (None if it cannot be planned)"""
+        cmds = []
         try:
             role = self.load_yaml(filepath)
             role_name = role['metadata']['name']
             env = role['metadata'].get('environment', 'all')
             
-            print(f"  Applying ProjectRole: {role_name} ({env})")
+            self.log(f"  Applying ProjectRole: {role_name} ({env})")
             
             if not self.dry_run:
                 # Using Infisical CLI or API
@@ -44,28 +80,25 @@ class InfisicalReconciler:
                     "--permissions", json.dumps(role['spec']['permissions'])
                 ]
                 
-                # For now, simulate the command
-                print(f"    CMD: {' '.join(cmd)}")
-                # result = subprocess.run(cmd, capture_output=True, text=True)
-                # if result.returncode != 0:
-                #     raise Exception(result.stderr)
+                self.log(f"    CMD: {' '.join(cmd)}")
+                cmds.append(cmd)
             
-            self.applied.append(f"ProjectRole/{role_name}")
-            return True
+            return f"ProjectRole/{role_name} ({filepath.name})", cmds
             
         except Exception as e:
-            print(f"    ❌ Failed: {e}")
+            self.log(f"    ❌ Failed: {e}")
             self.failed.append(f"ProjectRole/{filepath.name}")
-            return False
+            return None
     
-    def apply_identity(self, filepath: Path) -> bool:
-        """Apply MachineIdentity resource"""
+    def apply_identity(self, filepath: Path) -> Optional[Planned]:
+        """Plan MachineIdentity resource, returning its label and CLI commands (None if it cannot be planned)"""
+        cmds = []
         try:
             identity = self.load_yaml(filepath)
             name = identity['metadata']['name']
             env = identity['spec']['environment']
             
-            print(f"  Applying MachineIdentity: {name} ({env})")
+            self.log(f"  Applying MachineIdentity: {name} ({env})")
             
             if not self.dry_run:
                 # Using Infisical CLI or API
@@ -77,27 +110,27 @@ class InfisicalReconciler:
                     "--environment", env
                 ]
                 
-                print(f"    CMD: {' '.join(cmd)}")
-                # Execute command here
+                self.log(f"    CMD: {' '.join(cmd)}")
+                cmds.append(cmd)
             
-            self.applied.append(f"MachineIdentity/{name}")
-            return True
+            return f"MachineIdentity/{name} ({filepath.name})", cmds
             
         except Exception as e:
-            print(f"    ❌ Failed: {e}")
+            self.log(f"    ❌ Failed: {e}")
             self.failed.append(f"MachineIdentity/{filepath.name}")
-            return False
+            return None
     
-    def apply_binding(self, filepath: Path) -> bool:
-        """Apply IdentityBinding resource"""
+    def apply_binding(self, filepath: Path) -> Optional[Planned]:
+        """Plan IdentityBinding resource, returning its label and CLI commands (None if it cannot be planned)"""
+        cmds = []
         try:
             binding = self.load_yaml(filepath)
             name = binding['metadata']['name']
             identity = binding['spec']['identity']
             role = binding['spec']['role']
             
-            print(f"  Applying IdentityBinding: {name}")
-            print(f"    Identity: {identity} -> Role: {role}")
+            self.log(f"  Applying IdentityBinding: {name}")
+            self.log(f"    Identity: {identity} -> Role: {role}")
             
             if not self.dry_run:
                 # Using Infisical CLI or API
@@ -110,58 +143,117 @@ class InfisicalReconciler:
                         "--project", self.project
                     ]
                     
-                    print(f"    CMD: {' '.join(cmd)}")
-                    # Execute command here
+                    self.log(f"    CMD: {' '.join(cmd)}")
+                    cmds.append(cmd)
             
-            self.applied.append(f"IdentityBinding/{name}")
-            return True
+            return f"IdentityBinding/{name} ({filepath.name})", cmds
             
         except Exception as e:
-            print(f"    ❌ Failed: {e}")
+            self.log(f"    ❌ Failed: {e}")
             self.failed.append(f"IdentityBinding/{filepath.name}")
-            return False
+            return None
     
-    def reconcile(self) -> bool:
+    def scan_artifacts(self) -> Dict[str, List[Path]]:
+        """List artifact files by prefix in a single directory pass, each list sorted"""
+        found: Dict[str, List[Path]] = {prefix: [] for prefix in ARTIFACT_PREFIXES}
+        with os.scandir(self.artifacts_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".yaml"):
+                    continue
+                for prefix in ARTIFACT_PREFIXES:
+                    if entry.name.startswith(prefix):
+                        found[prefix].append(Path(entry.path))
+                        break
+        for files in found.values():
+            files.sort()
+        return found
+    
+    async def run_batch(self, kind: str, planned: List[Planned]) -> bool:
+        """Run one phase's CLI commands concurrently, bounded by MAX_CONCURRENCY
+        
+        A resource is recorded as applied only once all of its commands succeed.
+        Without --execute the commands are only printed, so every resource counts
+        as applied.
+        """
+        # Results are keyed by plan position; labels need not be unique
+        pairs = [(i, cmd) for i, (_, cmds) in enumerate(planned) for cmd in cmds]
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        
+        async def _apply(cmd: List[str]):
+            async with sem:
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                    )
+                except OSError as e:
+                    return 127, str(e)
+                _, stderr = await proc.communicate()
+                return proc.returncode, stderr.decode(errors='replace')
+        
+        results = []
+        if self.execute and pairs:
+            results = await asyncio.gather(*(_apply(cmd) for _, cmd in pairs))
+        
+        failed = set()
+        for (i, cmd), (returncode, stderr) in zip(pairs, results):
+            if returncode != 0:
+                self.log(f"    ❌ {planned[i][0]}: {' '.join(cmd[:3])} failed: {stderr.strip()}")
+                failed.add(i)
+        
+        for i, (label, _) in enumerate(planned):
+            if i in failed:
+                self.failed.append(label)
+            else:
+                self.applied.append(label)
+        
+        if results and not failed:
+            self.log(f"    ✅ {kind}: {len(pairs)} commands")
+        return not failed
+    
+    async def reconcile(self) -> bool:
         """Main reconciliation logic"""
-        print(f"\n🔄 Reconciling Infisical resources for project: {self.project}")
+        self.log(f"\n🔄 Reconciling Infisical resources for project: {self.project}")
         
         if self.dry_run:
-            print("  ⚠️  DRY RUN MODE - No changes will be applied")
+            self.log("  ⚠️  DRY RUN MODE - No changes will be applied")
         
         if not self.artifacts_dir.exists():
-            print(f"  ❌ Artifacts directory not found: {self.artifacts_dir}")
+            self.log(f"  ❌ Artifacts directory not found: {self.artifacts_dir}")
             return False
         
-        # Order matters: roles -> identities -> bindings
-        
-        # 1. Apply ProjectRoles
-        print("\n📋 Applying ProjectRoles...")
-        for role_file in sorted(self.artifacts_dir.glob("ProjectRole_*.yaml")):
-            self.apply_project_role(role_file)
+        artifacts = self.scan_artifacts()
         
-        # 2. Apply MachineIdentities
-        print("\n🤖 Applying MachineIdentities...")
-        for identity_file in sorted(self.artifacts_dir.glob("identity_*.yaml")):
-            self.apply_identity(identity_file)
+        # Order matters: roles -> identities -> bindings; a phase whose commands fail
+        # stops the later ones, since they depend on what it creates
+        phases = [
+            ("\n📋 Applying ProjectRoles...", "ProjectRole", "ProjectRole_", self.apply_project_role),
+            ("\n🤖 Applying MachineIdentities...", "MachineIdentity", "identity_", self.apply_identity),
+            ("\n🔗 Applying IdentityBindings...", "IdentityBinding", "binding_", self.apply_binding),
+        ]
         
-        # 3. Apply IdentityBindings
-        print("\n🔗 Applying IdentityBindings...")
-        for binding_file in sorted(self.artifacts_dir.glob("binding_*.yaml")):
-            self.apply_binding(binding_file)
+        for i, (header, kind, prefix, apply) in enumerate(phases):
+            self.log(header)
+            planned = [p for p in (apply(f) for f in artifacts[prefix]) if p is not None]
+            ok = await self.run_batch(kind, planned)
+            self.flush()
+            if not ok:
+                if i < len(phases) - 1:
+                    self.log(f"\n⛔ {kind} phase failed; skipping remaining phases")
+                break
         
         # Summary
-        print("\n📊 Reconciliation Summary:")
-        print(f"  ✅ Applied: {len(self.applied)} resources")
+        self.log("\n📊 Reconciliation Summary:")
+        self.log(f"  ✅ Applied: {len(self.applied)} resources")
         for resource in self.applied:
-            print(f"     - {resource}")
+            self.log(f"     - {resource}")
         
         if self.failed:
-            print(f"  ❌ Failed: {len(self.failed)} resources")
+            self.log(f"  ❌ Failed: {len(self.failed)} resources")
             for resource in self.failed:
-                print(f"     - {resource}")
+                self.log(f"     - {resource}")
             return False
         
-        print(f"\n✅ Reconciliation complete for project: {self.project}")
+        self.log(f"\n✅ Reconciliation complete for project: {self.project}")
         return True
 
 def main():
@@ -169,6 +261,7 @@ def main():
     parser.add_argument("project", help="Project name")
     parser.add_argument("--dry-run", action="store_true", help="Simulate without applying")
     parser.add_argument("--config", help="Path to Infisical config file")
+    parser.add_argument("--execute", action="store_true", help="Run the generated Infisical CLI commands instead of only printing them")
     
     args = parser.parse_args()
     
@@ -177,8 +270,11 @@ def main():
         os.environ["INFISICAL_CONFIG"] = args.config
     
     # Run reconciliation
-    reconciler = InfisicalReconciler(args.project, args.dry_run)
-    success = reconciler.reconcile()
+    reconciler = InfisicalReconciler(args.project, args.dry_run, args.execute)
+    try:
+        success = asyncio.run(reconciler.reconcile())
+    finally:
+        reconciler.flush()
     
     sys.exit(0 if success else 1)
 
@@ -4,30 +4,59 @@ Reconcile Supabase configuration from generated manifest
 Ensures JWT security, RLS enforcement, and proper secret handling
 """
 
+import asyncio
 import json
 import sys
 import os
 from pathlib import Path
 import subprocess
 import argparse
-from typing import Dict, Any
+from typing import Dict, List, Any
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
+
+# Max edge function deploys in flight at once
+MAX_CONCURRENT_DEPLOYS = 8
+
+# Parsed manifests keyed by (path, mtime_ns, size), so unchanged files are parsed once
+_JSON_CACHE: Dict[tuple, Any] = {}
 
 class SupabaseReconciler:
-    def __init__(self, project: str, dry_run: bool = False):
+    def __init__(self, project: str, dry_run: bool = False, execute: bool = False):
         self.project = project
         self.dry_run = dry_run
+        self.execute = execute
         self.manifest_path = Path(f".out/{project}/supabase-config.json")
         self.config = None
+        self._log: List[str] = []
         
+    def log(self, msg: str = "") -> None:
+        """Queue a line of output; written out by flush()"""
+        self._log.append(msg)
+    
+    def flush(self) -> None:
+        """Write queued output in a single call"""
+        if self._log:
+            sys.stdout.write('\n'.join(self._log) + '\n')
+            sys.stdout.flush()
+            self._log.clear()
+    
     def load_manifest(self) -> bool:
         """Load the Supabase configuration manifest"""
         if not self.manifest_path.exists():
-            print(f"❌ Manifest not found: {self.manifest_path}")
-            print("Run 'make render' first to generate artifacts")
+            self.log(f"❌ Manifest not found: {self.manifest_path}")
+            self.log("Run 'make render' first to generate artifacts")
             return False
         
-        with open(self.manifest_path, 'r') as f:
-            self.config = json.load(f)
+        st = self.manifest_path.stat()
+        key = (str(self.manifest_path), st.st_mtime_ns, st.st_size)
+        if key not in _JSON_CACHE:
+            data = self.manifest_path.read_bytes()
+            _JSON_CACHE[key] = orjson.loads(data) if orjson is not None else json.loads(data)
+        self.config = _JSON_CACHE[key]
         
         return True
     
@@ -38,21 +67,21 @@ class SupabaseReconciler:
         # Check JWT secret is present (as reference)
         jwt_secret = auth.get('jwt_secret')
         if not jwt_secret:
-            print("  ❌ JWT secret is missing")
+            self.log("  ❌ JWT secret is missing")
             return False
         
         # Validate JWT expiry (must be <= 24 hours)
         jwt_exp = auth.get('jwt_exp', 0)
         if jwt_exp > 86400:  # 24 hours in seconds
-            print(f"  ❌ JWT expiry too long: {jwt_exp}s (max: 86400s)")
+            self.log(f"  ❌ JWT expiry too long: {jwt_exp}s (max: 86400s)")
             return False
         
-        print(f"  ✅ JWT configured: exp={jwt_exp}s")
+        self.log(f"  ✅ JWT configured: exp={jwt_exp}s")
         return True
     
     def apply_auth_settings(self) -> bool:
         """Apply authentication settings"""
-        print("\n🔐 Applying Authentication Settings...")
+        self.log("\n🔐 Applying Authentication Settings...")
         
         if not self.validate_jwt_config():
             return False
@@ -65,7 +94,7 @@ class SupabaseReconciler:
             if jwt_secret_ref and jwt_secret_ref.startswith('${'):
                 # Extract the secret name
                 secret_name = jwt_secret_ref.strip('${}')
-                print(f"  Fetching {secret_name} from Infisical...")
+                self.log(f"  Fetching {secret_name} from Infisical...")
                 
                 # In production, fetch from Infisical
                 # jwt_secret = subprocess.check_output(
@@ -76,27 +105,27 @@ class SupabaseReconciler:
             # Apply auth providers
             providers = auth.get('providers', [])
             for provider in providers:
-                print(f"  Configuring provider: {provider}")
+                self.log(f"  Configuring provider: {provider}")
                 if not self.dry_run:
                     # supabase auth providers enable {provider}
                     pass
         else:
-            print("  [DRY RUN] Would configure auth settings")
+            self.log("  [DRY RUN] Would configure auth settings")
         
         return True
     
     def apply_database_settings(self) -> bool:
         """Apply database settings including RLS"""
-        print("\n🗄️  Applying Database Settings...")
+        self.log("\n🗄️  Applying Database Settings...")
         
         db = self.config.get('database', {})
         rls_enforced = db.get('rls_enforced', True)
         
         if not rls_enforced:
-            print("  ⚠️  WARNING: RLS is not enforced - this is a security risk!")
+            self.log("  ⚠️  WARNING: RLS is not enforced - this is a security risk!")
             return False
         
-        print(f"  ✅ RLS enforced: {rls_enforced}")
+        self.log(f"  ✅ RLS enforced: {rls_enforced}")
         
         if not self.dry_run:
             # Enable RLS on all tables
@@ -111,16 +140,16 @@ class SupabaseReconciler:
             ]
             
             for sql in sql_commands:
-                print(f"    SQL: {sql}")
+                self.log(f"    SQL: {sql}")
                 # In production: supabase db execute "{sql}"
         else:
-            print("  [DRY RUN] Would enable RLS on all tables")
+            self.log("  [DRY RUN] Would enable RLS on all tables")
         
         return True
     
     def apply_environment_variables(self) -> bool:
         """Apply public environment variables"""
-        print("\n🌍 Applying Environment Variables...")
+        self.log("\n🌍 Applying Environment Variables...")
         
         env = self.config.get('environment', {})
         public_env = env.get('public', {})
@@ -128,64 +157,97 @@ class SupabaseReconciler:
         for key, value in public_env.items():
             # Validate public env vars
             if 'SUPABASE_SERVICE_KEY' in key:
-                print(f"  ❌ BLOCKED: {key} - service key must never be public!")
+                self.log(f"  ❌ BLOCKED: {key} - service key must never be public!")
                 return False
             
             if key.startswith('NEXT_PUBLIC_SUPABASE_'):
-                print(f"  ✅ Setting {key}")
+                self.log(f"  ✅ Setting {key}")
                 if not self.dry_run:
                     # Set in Supabase project settings
                     # This would use Supabase Management API
                     pass
             else:
-                print(f"  ⚠️  Skipping {key} - not a Supabase public var")
+                self.log(f"  ⚠️  Skipping {key} - not a Supabase public var")
         
         return True
     
-    def apply_edge_functions(self) -> bool:
-        """Deploy Edge Functions if configured"""
-        print("\n⚡ Checking Edge Functions...")
+    async def apply_edge_functions(self) -> bool:
+        """Deploy Edge Functions if configured, submitting all deploys concurrently"""
+        self.log("\n⚡ Checking Edge Functions...")
         
         # Check if edge functions directory exists
         edge_dir = Path(f"supabase/functions/{self.project}")
         
         if edge_dir.exists():
             functions = list(edge_dir.glob("*/index.ts"))
-            print(f"  Found {len(functions)} edge functions")
+            self.log(f"  Found {len(functions)} edge functions")
             
+            cmds = []
             for func_path in functions:
                 func_name = func_path.parent.name
-                print(f"  Deploying function: {func_name}")
+                self.log(f"  Deploying function: {func_name}")
                 
                 if not self.dry_run:
                     # Deploy edge function
                     cmd = ["supabase", "functions", "deploy", func_name]
-                    print(f"    CMD: {' '.join(cmd)}")
-                    # subprocess.run(cmd)
+                    self.log(f"    CMD: {' '.join(cmd)}")
+                    cmds.append(cmd)
+            
+            if self.execute and cmds:
+                return await self.deploy_all(cmds)
         else:
-            print("  No edge functions found")
+            self.log("  No edge functions found")
         
         return True
     
-    def reconcile(self) -> bool:
+    async def deploy_all(self, cmds: List[List[str]]) -> bool:
+        """Run deploy commands concurrently, bounded by MAX_CONCURRENT_DEPLOYS"""
+        sem = asyncio.Semaphore(MAX_CONCURRENT_DEPLOYS)
+        
+        async def deploy(cmd: List[str]):
+            async with sem:
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+                    )
+                except OSError as e:
+                    return 127, str(e)
+                output, _ = await proc.communicate()
+                return proc.returncode, output.decode(errors='replace')
+        
+        results = await asyncio.gather(*(deploy(cmd) for cmd in cmds))
+        
+        # Output is captured per function and logged in order, so concurrent deploys never interleave
+        ok = True
+        for cmd, (returncode, output) in zip(cmds, results):
+            func_name = cmd[-1]
+            if returncode == 0:
+                self.log(f"  ✅ Deployed function: {func_name}")
+            else:
+                self.log(f"  ❌ Deploy failed: {func_name} (exit {returncode})")
+                ok = False
+            for line in output.strip().splitlines():
+                self.log(f"    {line}")
+        return ok
+    
+    async def reconcile(self) -> bool:
         """Main reconciliation logic"""
-        print(f"\n🔄 Reconciling Supabase configuration for project: {self.project}")
+        self.log(f"\n🔄 Reconciling Supabase configuration for project: {self.project}")
         
         if self.dry_run:
-            print("  ⚠️  DRY RUN MODE - No changes will be applied")
+            self.log("  ⚠️  DRY RUN MODE - No changes will be applied")
         
         # Load manifest
         if not self.load_manifest():
             return False
         
-        print(f"\n📋 Configuration loaded from: {self.manifest_path}")
+        self.log(f"\n📋 Configuration loaded from: {self.manifest_path}")
         
         # Apply settings in order
         steps = [
             ("Authentication", self.apply_auth_settings),
             ("Database", self.apply_database_settings),
             ("Environment", self.apply_environment_variables),
-            ("Edge Functions", self.apply_edge_functions),
         ]
         
         results = {}
@@ -193,21 +255,30 @@ class SupabaseReconciler:
             try:
                 results[step_name] = step_func()
             except Exception as e:
-                print(f"\n❌ {step_name} failed: {e}")
+                self.log(f"\n❌ {step_name} failed: {e}")
                 results[step_name] = False
+            self.flush()
+        
+        # Edge function deploys are the only async step
+        try:
+            results["Edge Functions"] = await self.apply_edge_functions()
+        except Exception as e:
+            self.log(f"\n❌ Edge Functions failed: {e}")
+            results["Edge Functions"] = False
+        self.flush()
         
         # Summary
-        print("\n📊 Reconciliation Summary:")
+        self.log("\n📊 Reconciliation Summary:")
         for step, success in results.items():
             status = "✅" if success else "❌"
-            print(f"  {status} {step}")
+            self.log(f"  {status} {step}")
         
         all_success = all(results.values())
         
         if all_success:
-            print(f"\n✅ Supabase reconciliation complete for project: {self.project}")
+            self.log(f"\n✅ Supabase reconciliation complete for project: {self.project}")
         else:
-            print(f"\n❌ Supabase reconciliation failed for project: {self.project}")
+            self.log(f"\n❌ Supabase reconciliation failed for project: {self.project}")
         
         return all_success
 
@@ -217,6 +288,7 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Simulate without applying")
     parser.add_argument("--supabase-url", help="Supabase project URL")
     parser.add_argument("--supabase-key", help="Supabase service role key")
+    parser.add_argument("--execute", action="store_true", help="Run the generated Supabase CLI commands instead of only printing them")
     
     args = parser.parse_args()
     
@@ -227,8 +299,11 @@ def main():
         os.environ["SUPABASE_SERVICE_KEY"] = args.supabase_key
     
     # Run reconciliation
-    reconciler = SupabaseReconciler(args.project, args.dry_run)
-    success = reconciler.reconcile()
+    reconciler = SupabaseReconciler(args.project, args.dry_run, args.execute)
+    try:
+        success = asyncio.run(reconciler.reconcile())
+    finally:
+        reconciler.flush()
     
     sys.exit(0 if success else 1)
 
@@ -1,73 +1,208 @@
 #!/usr/bin/env python3
+import functools
+import hashlib
 import json
+import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import yaml
+
+try:
+  from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:  # libyaml not available
+  from yaml import SafeDumper, SafeLoader
+
+try:
+  import orjson
+except ImportError:  # fall back to the stdlib json module
+  orjson = None
+
 OUT_DIR = Path('.out/journal')
+DATA_DIR = Path('data')
+OPA_CACHE_DIR = OUT_DIR / '.opa-cache'
+OPA_BUNDLE = Path('.out/.opa-bundle.json')
+# Written after a complete render with the stamp of its inputs followed by the
+# artifact filenames it produced; removed while rendering
+RENDER_OK = OUT_DIR / '.ok'
+DATA_SUFFIXES = ('.yaml', '.yml', '.json')
+
+# Everything main() needs from OPA, fetched in a single evaluation
+ARTIFACT_QUERY = (
+  '{"journal": data.infisical.journal,'
+  ' "vercel": data.platforms.vercel,'
+  ' "supabase": data.platforms.supabase}'
+)
+
+def loads_json(data: bytes):
+  """Parse JSON bytes, with orjson when available."""
+  return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def dumps_json(obj, indent: bool = False) -> bytes:
+  """Serialize obj to UTF-8 JSON bytes with a trailing newline, with orjson when available."""
+  if orjson is not None:
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0) + b'\n'
+  return (json.dumps(obj, indent=2 if indent else None, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+def _str_keys(obj, source: str):
+  """Recursively convert mapping keys to JSON strings, as OPA does when loading YAML."""
+  if isinstance(obj, dict):
+    out = {}
+    for k, v in obj.items():
+      key = k if isinstance(k, str) else json.dumps(k) if k is None or isinstance(k, bool) else str(k)
+      if key in out:
+        raise ValueError(f"{source}: duplicate key {key!r} after converting keys to strings")
+      out[key] = _str_keys(v, source)
+    return out
+  if isinstance(obj, list):
+    return [_str_keys(v, source) for v in obj]
+  return obj
+
+def _merge_data(dst: dict, src: dict, where: str, source: str):
+  """Deep-merge src into dst, raising on conflicting values as OPA's loader does."""
+  for k, v in src.items():
+    if k not in dst:
+      dst[k] = v
+    elif isinstance(dst[k], dict) and isinstance(v, dict):
+      _merge_data(dst[k], v, f"{where}.{k}", source)
+    else:
+      raise ValueError(f"{source}: conflicting value for {where}.{k}")
+
+@functools.lru_cache(maxsize=None)
+def prepare_bundle() -> Path:
+  """Merge every data file under data/ into one JSON document for opa -d.
+
+  Each file's keys are mounted at its directory path, the same layout
+  `opa eval -d data/` produces, so queries are unaffected. Non-object
+  documents and conflicting keys raise ValueError, where opa would fail.
+  """
+  bundle = {}
+  for dirpath, dirnames, filenames in os.walk(DATA_DIR):
+    dirnames.sort()
+    where = 'data'
+    node = bundle
+    for part in Path(dirpath).relative_to(DATA_DIR).parts:
+      where = f"{where}.{part}"
+      node = node.setdefault(part, {})
+      if not isinstance(node, dict):
+        raise ValueError(f"{dirpath}: conflicting value for {where}")
+    for name in sorted(filenames):
+      if not name.endswith(DATA_SUFFIXES):
+        continue
+      path = os.path.join(dirpath, name)
+      with open(path, 'rb') as f:
+        doc = yaml.load(f, Loader=SafeLoader)
+      if not isinstance(doc, dict):
+        raise ValueError(f"{path}: data document must be an object, got {type(doc).__name__}")
+      _merge_data(node, _str_keys(doc, path), where, path)
+  OPA_BUNDLE.parent.mkdir(parents=True, exist_ok=True)
+  OPA_BUNDLE.write_bytes(dumps_json(bundle))
+  return OPA_BUNDLE
 
 def opa_eval(query: str):
-  """Run opa eval against policies/data and return the JSON value of the query."""
+  """Run opa eval against the data/ bundle and return the JSON value of the query."""
   cp = subprocess.run([
-    'opa','eval','-d','data/','-f','json',query
-  ], check=True, capture_output=True, text=True)
-  doc = json.loads(cp.stdout)
+    'opa','eval','-d',str(prepare_bundle()),'-f','json',query
+  ], check=True, capture_output=True)
+  doc = loads_json(cp.stdout)
   return doc['result'][0]['expressions'][0]['value']
 
-def write_yaml(path: Path, obj: dict):
-  # Minimal YAML emitter for flat dicts/lists
-  def emit(val, indent=0):
-    sp = '  '*indent
-    if isinstance(val, dict):
-      lines = []
-      for k,v in val.items():
-        if isinstance(v,(dict,list)):
-          lines.append(f"{sp}{k}:")
-          lines.append(emit(v, indent+1))
-        else:
-          sval = json.dumps(v) if isinstance(v, (str, bool)) or v is None else v
-          lines.append(f"{sp}{k}: {sval}")
-      return '\n'.join(lines)
-    elif isinstance(val, list):
-      lines = []
-      for item in val:
-        if isinstance(item,(dict,list)):
-          lines.append(f"{sp}-")
-          lines.append(emit(item, indent+1))
-        else:
-          sval = json.dumps(item) if isinstance(item, (str, bool)) or item is None else item
-          lines.append(f"{sp}- {sval}")
-      return '\n'.join(lines)
-    else:
-      return f"{sp}{val}"
+def _opa_version() -> str:
+  """Return `opa version` output, or '' if opa cannot be run."""
+  try:
+    cp = subprocess.run(['opa','version'], check=True, capture_output=True)
+  except (OSError, subprocess.CalledProcessError):
+    return ''
+  return cp.stdout.decode('utf-8', errors='replace')
 
+def _policy_fingerprint() -> str:
+  """Hash ARTIFACT_QUERY, the opa version and (relpath, mtime_ns, size) of every
+  file under data/ into a cache key."""
+  h = hashlib.blake2b(digest_size=16)
+  h.update(f"{ARTIFACT_QUERY}\0{_opa_version()}\0".encode())
+  for dirpath, dirnames, filenames in os.walk(DATA_DIR):
+    dirnames.sort()
+    for name in sorted(filenames):
+      p = os.path.join(dirpath, name)
+      st = os.stat(p)
+      h.update(f"{os.path.relpath(p, DATA_DIR)}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+  return h.hexdigest()
+
+def load_opa_cache(fp: str):
+  """Return the cached ARTIFACT_QUERY result for this data/ fingerprint, or None on a miss."""
+  try:
+    return loads_json((OPA_CACHE_DIR / f"{fp}.json").read_bytes())
+  except (FileNotFoundError, json.JSONDecodeError):
+    return None
+
+def save_opa_cache(fp: str, res: dict):
+  """Persist the ARTIFACT_QUERY result for this fingerprint, dropping stale entries."""
+  OPA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+  for stale in OPA_CACHE_DIR.glob('*.json'):
+    stale.unlink()
+  (OPA_CACHE_DIR / f"{fp}.json").write_bytes(dumps_json(res))
+
+def render_stamp(fp: str) -> str:
+  """Identify a render's inputs: the data/ fingerprint and this script's mtime."""
+  return f"{fp} {Path(__file__).stat().st_mtime_ns}\n"
+
+def up_to_date(stamp: str) -> bool:
+  """True if the last completed render used exactly these inputs and all its artifacts still exist."""
+  try:
+    head, *outputs = RENDER_OK.read_text(encoding='utf-8').splitlines()
+  except (FileNotFoundError, ValueError):
+    return False
+  return f"{head}\n" == stamp and bool(outputs) and all((OUT_DIR / name).is_file() for name in outputs)
+
+def write_yaml(path: Path, obj: dict):
+  """Emit obj as block-style YAML, preserving key order."""
   path.parent.mkdir(parents=True, exist_ok=True)
-  path.write_text(emit(obj) + "\n", encoding='utf-8')
+  with path.open('wb') as f:
+    yaml.dump(obj, f, Dumper=SafeDumper, sort_keys=False,
+              default_flow_style=False, encoding='utf-8')
 
 def main():
   OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-  # Load Infisical mirrors via OPA (OPA parses YAML → JSON)
-  journal = opa_eval('data.infisical.journal')
+  # The fingerprint catches edits, additions, deletions and renames under data/
+  fp = _policy_fingerprint()
+  stamp = render_stamp(fp)
+  if up_to_date(stamp):
+    print(f"Artifacts in {OUT_DIR} are up to date")
+    return
+  RENDER_OK.unlink(missing_ok=True)
+
+  # Load Infisical mirrors and platform manifests via OPA (OPA parses YAML → JSON).
+  # The result only depends on data/, so reuse it until that changes.
+  res = load_opa_cache(fp)
+  if res is None:
+    res = opa_eval(ARTIFACT_QUERY)
+    save_opa_cache(fp, res)
+  journal, vercel, supabase = res['journal'], res['vercel'], res['supabase']
+
   identities = journal['identities']
   project_roles = journal.get('project_roles', [])
 
+  # Collect (path, obj) pairs; filenames are unique so they can be written in any order
+  jobs = []
+
   # Roles
   for role in project_roles:
     slug = role['slug']
-    p = OUT_DIR / f"ProjectRole_{slug}.yaml"
-    write_yaml(p, {
+    jobs.append((OUT_DIR / f"ProjectRole_{slug}.yaml", {
       'apiVersion': 'infisical.verlyn13.dev/v1',
       'kind': 'ProjectRole',
       'metadata': {'name': role['name'], 'slug': slug},
       'spec': {'permissions': role['permissions']},
-    })
+    }))
 
   # Identities and bindings
   for ident in identities:
     name = ident['name']
     # Identity
-    write_yaml(OUT_DIR / f"identity_{name}.yaml", {
+    jobs.append((OUT_DIR / f"identity_{name}.yaml", {
       'apiVersion': 'infisical.verlyn13.dev/v1',
       'kind': 'MachineIdentity',
       'metadata': {'name': name, 'labels': {'env': ident.get('env')}} ,
@@ -75,10 +210,10 @@ def main():
         'project_role': ident.get('project_role'),
         'auth': ident.get('auth', {}),
       }
-    })
+    }))
     # Binding
     perms = ident.get('permissions', {})
-    write_yaml(OUT_DIR / f"binding_{name}.yaml", {
+    jobs.append((OUT_DIR / f"binding_{name}.yaml", {
       'apiVersion': 'infisical.verlyn13.dev/v1',
       'kind': 'ProjectBinding',
       'metadata': {'identity': name, 'environment': ident.get('env')},
@@ -89,20 +224,27 @@ def main():
           'write_paths': perms.get('write_paths', []),
         }
       }
-    })
+    }))
+
+  if jobs:
+    with ThreadPoolExecutor(max_workers=min(32, len(jobs))) as ex:
+      list(ex.map(lambda j: write_yaml(*j), jobs))
 
   # Platform manifests (Vercel/Supabase)
-  vercel = opa_eval('data.platforms.vercel')
-  supabase = opa_eval('data.platforms.supabase')
+  (OUT_DIR / 'vercel-env.json').write_bytes(dumps_json(vercel, indent=True))
+  (OUT_DIR / 'supabase-config.json').write_bytes(dumps_json(supabase, indent=True))
 
-  (OUT_DIR / 'vercel-env.json').write_text(json.dumps(vercel, indent=2) + '\n', encoding='utf-8')
-  (OUT_DIR / 'supabase-config.json').write_text(json.dumps(supabase, indent=2) + '\n', encoding='utf-8')
+  outputs = [path.name for path, _ in jobs] + ['vercel-env.json', 'supabase-config.json']
 
+  RENDER_OK.write_text(stamp + ''.join(f"{name}\n" for name in outputs), encoding='utf-8')
   print(f"Artifacts written to {OUT_DIR}")
 
 if __name__ == '__main__':
   try:
     main()
   except subprocess.CalledProcessError as e:
-    sys.stderr.write(e.stderr)
+    sys.stderr.write(e.stderr.decode('utf-8', errors='replace'))
+    sys.exit(1)
+  except (ValueError, TypeError) as e:
+    sys.stderr.write(f"{e}\n")
     sys.exit(1)
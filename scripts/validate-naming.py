@@ -4,8 +4,10 @@ Validate Terraform resource naming conventions
 """
 
 import re
+import os
+import mmap
 import sys
-import glob
+from concurrent.futures import ProcessPoolExecutor
 
 # Naming pattern: <resource_type>-<workload>-<environment>-<region>-<instance>
 NAMING_PATTERN = r'^[a-z]{2,5}-[a-z0-9]{2,20}-(dev|stg|prod)-(hel1|fsn1|nbg1)-[0-9]{3}$'
@@ -21,21 +23,59 @@ ABBREVIATIONS = {
     'terraform_workspace': 'tfw',
 }
 
+# Only managed resource types are matched, so other declarations are skipped by the regex.
+# Patterns are bytes so files can be scanned without decoding them.
+RESOURCE_TYPES = b'|'.join(re.escape(t.encode()) for t in ABBREVIATIONS)
+RESOURCE_RE = re.compile(rb'resource\s+"(' + RESOURCE_TYPES + rb')"\s+"([^"]+)"')
+NAME_RE = re.compile(NAMING_PATTERN.encode())
+
+# Minimum number of .tf files before scanning is spread across processes
+PARALLEL_THRESHOLD = 64
+
+# Directories never scanned for Terraform sources
+PRUNE = {'.git', '.terraform', 'node_modules', '.out'}
+
+def iter_tf_files(root='.'):
+    """Yield .tf file paths under root, skipping pruned and hidden directories"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in PRUNE and not d.startswith('.')]
+        for filename in filenames:
+            if filename.endswith('.tf'):
+                yield os.path.normpath(os.path.join(dirpath, filename))
+
+def scan_file(tf_file):
+    """Return naming errors for one Terraform file"""
+    errors = []
+    
+    # Map the file instead of reading it, so large files are not copied into memory
+    with open(tf_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return errors
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            # Find managed resource declarations
+            for m in RESOURCE_RE.finditer(content):
+                resource_type, resource_name = m.groups()
+                if not NAME_RE.match(resource_name):
+                    resource_type = resource_type.decode()
+                    resource_name = resource_name.decode(errors='replace')
+                    errors.append(f"{tf_file}: {resource_type}.{resource_name} does not follow naming convention")
+    
+    return errors
+
 def validate_resource_names():
     """Validate all resource names in Terraform files"""
     errors = []
+    tf_files = list(iter_tf_files())
     
-    for tf_file in glob.glob('**/*.tf', recursive=True):
-        with open(tf_file, 'r') as f:
-            content = f.read()
-            
-        # Find resource declarations
-        resources = re.findall(r'resource\s+"([^"]+)"\s+"([^"]+)"', content)
-        
-        for resource_type, resource_name in resources:
-            if resource_type in ABBREVIATIONS:
-                if not re.match(NAMING_PATTERN, resource_name):
-                    errors.append(f"{tf_file}: {resource_type}.{resource_name} does not follow naming convention")
+    # Small trees are scanned inline; spawning workers would cost more than the scan
+    if len(tf_files) < PARALLEL_THRESHOLD:
+        for tf_file in tf_files:
+            errors.extend(scan_file(tf_file))
+        return errors
+    
+    with ProcessPoolExecutor() as ex:
+        for file_errors in ex.map(scan_file, tf_files, chunksize=32):
+            errors.extend(file_errors)
     
     return errors
 
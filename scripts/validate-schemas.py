@@ -9,6 +9,16 @@ import sys
 from pathlib import Path
 from jsonschema import validate, ValidationError, Draft7Validator
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader
+
+try:
+    import fastjsonschema
+except ImportError:  # fall back to interpreting schemas with jsonschema only
+    fastjsonschema = None
+
 # Schema mappings
 SCHEMA_MAP = {
     'projects/*/project.yaml': 'schemas/project.schema.json',
@@ -25,17 +35,25 @@ def load_schema(schema_path):
 def load_yaml(yaml_path):
     """Load a YAML file"""
     with open(yaml_path, 'r') as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=SafeLoader)
 
-def validate_file(file_path, schema_path):
-    """Validate a YAML file against a schema"""
+def validate_file(file_path, validator, compiled=None):
+    """Validate a YAML file with a prebuilt schema validator
+    
+    If a fastjsonschema-compiled check is given it is tried first; the
+    jsonschema validator only runs to report errors for failing files.
+    """
     try:
-        # Load files
-        schema = load_schema(schema_path)
         data = load_yaml(file_path)
         
-        # Validate
-        validator = Draft7Validator(schema)
+        if compiled is not None:
+            try:
+                compiled(data)
+                print(f"✅ {file_path}")
+                return True
+            except fastjsonschema.JsonSchemaException:
+                pass
+        
         errors = list(validator.iter_errors(data))
         
         if errors:
@@ -61,23 +79,47 @@ def main():
     print("Schema Validation Report")
     print("=" * 50)
     
-    for pattern, schema_path in SCHEMA_MAP.items():
-        # Check if schema exists
+    # Parse each schema and build its validators once, shared by all matching files
+    schemas = {}
+    schema_errors = {}
+    for schema_path in set(SCHEMA_MAP.values()):
         if not Path(schema_path).exists():
+            continue
+        try:
+            schemas[schema_path] = load_schema(schema_path)
+        except (OSError, json.JSONDecodeError) as e:
+            schema_errors[schema_path] = str(e)
+    validators = {schema_path: Draft7Validator(schema) for schema_path, schema in schemas.items()}
+    compiled = {}
+    if fastjsonschema is not None:
+        for schema_path, schema in schemas.items():
+            try:
+                compiled[schema_path] = fastjsonschema.compile(schema, use_default=False)
+            except fastjsonschema.JsonSchemaDefinitionException:
+                pass  # validated with Draft7Validator only
+    
+    for pattern, schema_path in SCHEMA_MAP.items():
+        # Check if schema exists and loaded
+        if schema_path in schema_errors:
+            print(f"❌ {schema_path}: {schema_errors[schema_path]}")
+            all_valid = False
+            continue
+        validator = validators.get(schema_path)
+        if validator is None:
             print(f"⚠️  Schema not found: {schema_path}")
             continue
             
         # Find matching files
         for file_path in root.glob(pattern):
             if file_path.is_file():
-                valid = validate_file(file_path, schema_path)
+                valid = validate_file(file_path, validator, compiled.get(schema_path))
                 validated_count += 1
                 if not valid:
                     all_valid = False
     
     print("=" * 50)
     
-    if validated_count == 0:
+    if validated_count == 0 and all_valid:
         print("⚠️  No files found to validate")
         sys.exit(0)
     